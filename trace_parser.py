@@ -6,26 +6,102 @@ Specialized Parser for Home Assistant Traces - v6.0
 # Required libraries:
 #   - pyyaml
 #   - tzlocal
-#   - pytz
+#   - pytz (fallback when zoneinfo or its time zone data is not available)
 #   - colorama (optional, for colored CLI output)
 #   - rich (optional, for pretty printing)
+#   - orjson (optional, for faster JSON parsing and formatting)
 #
 # Install all required libraries with:
 #   pip install pyyaml tzlocal pytz
 #
 # For optional features:
-#   pip install colorama rich
+#   pip install colorama rich orjson
 #
 # ------------------------------------------------------
 
 import json
+import re
+import sys
 import yaml
 import pytz
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+from math import isfinite
+from operator import itemgetter
 from pathlib import Path
-import pprint
 import tzlocal
 
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Use the libyaml-backed loader/dumper when available (much faster on large automations)
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# Buffer size for the output file (amortizes write syscalls over many small lines)
+_OUTPUT_BUFFER_SIZE = 1 << 20
+
+class _NonFiniteFloat(float):
+    """NaN/Infinity parsed by the standard library. orjson refuses float subclasses (instead of writing null),
+    so dump_json renders these values with the standard library, as NaN/Infinity."""
+
+def _parse_float(text):
+    value = float(text)
+    return value if isfinite(value) else _NonFiniteFloat(value)
+
+def load_json(f):
+    """Parses a JSON file opened in binary mode, using orjson when available.
+    Falls back to the standard library for input orjson rejects (NaN, Infinity, numbers out of double range).
+    Note: orjson parses integers that do not fit in 64 bits as (rounded) floats; the standard library keeps them exact."""
+    data = f.read()
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data, parse_float=_parse_float, parse_constant=_NonFiniteFloat)
+
+def dump_json(value):
+    """Serializes a value as indented JSON (non-ASCII kept as is), using orjson when available.
+    Note: orjson writes float exponents without '+' or leading zeros (1e16, 1e-7 instead of 1e+16, 1e-07)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            # Values only the standard library parses and serializes faithfully: integers above 64 bits
+            # and the NaN/Infinity floats tagged by load_json
+            pass
+    return json.dumps(value, indent=2, ensure_ascii=False)
+
+# Plural/singular path segments used by different Home Assistant versions in traces
+_PATH_VARIATIONS = (
+    ('action/', 'actions/'),
+    ('actions/', 'action/'),
+    ('condition/', 'conditions/'),
+    ('conditions/', 'condition/'),
+    ('trigger/', 'triggers/'),
+    ('triggers/', 'trigger/'),
+)
+
+# Single-pass swap of every action(s)/condition(s)/trigger(s) path segment (used for paths still unmapped)
+_PLURAL_SWAP = {
+    'action': 'actions', 'actions': 'action',
+    'condition': 'conditions', 'conditions': 'condition',
+    'trigger': 'triggers', 'triggers': 'trigger',
+}
+_PLURAL_RE = re.compile(r'(?<![^/])(actions?|conditions?|triggers?)(?=/)')
+
+def swap_plural_segments(path):
+    """Returns the path with every action(s), condition(s) and trigger(s) segment swapped between singular and plural."""
+    return _PLURAL_RE.sub(lambda match: _PLURAL_SWAP[match.group(1)], path)
+
 # Settings
 def get_timezone(cli_timezone=None):
     if cli_timezone:
@@ -35,67 +111,114 @@ def get_timezone(cli_timezone=None):
     except Exception:
         return 'UTC'
 
+@lru_cache(maxsize=8)
+def _get_tz(name):
+    """Returns the tzinfo for a timezone name, using the stdlib zoneinfo when available and pytz otherwise."""
+    if name in ('UTC', 'Etc/UTC'):
+        # Same tzinfo object that fromisoformat() gives to '+00:00' timestamps, so they need no conversion
+        return dt_timezone.utc
+    if ZoneInfo is not None:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            # e.g. Windows without the tzdata package
+            pass
+    return pytz.timezone(name)
+
+@lru_cache(maxsize=None)
+def _get_pretty():
+    """Imports (and initializes) the optional colorama and rich libraries once.
+    Returns (Fore, Style, rich_print); the ones that are not installed are None."""
+    try:
+        from colorama import Fore, Style, init as colorama_init
+        colorama_init()
+    except ImportError:
+        Fore = Style = None
+    try:
+        from rich import print as rich_print
+    except ImportError:
+        rich_print = None
+    return Fore, Style, rich_print
+
+def dump_yaml(value):
+    """Serializes a structure as block-style YAML (keys in their original order) for the header dump."""
+    return yaml.dump(value, Dumper=_YAML_DUMPER, sort_keys=False, width=120, allow_unicode=True,
+                     default_flow_style=False).rstrip('\n')
+
 def load_automation(yaml_file):
     """Loads the automation YAML and maps all paths with their aliases recursively, including aliases at any level and in any block.
-    Also associates the alias with the item's path and main sub-blocks (if, then, else, repeat, choose, etc). Now, every level is mapped, even without an alias, using the inherited alias + relative path as the default value."""
-    def map_steps(base, steps, mapping, nearest_alias=None, nearest_alias_path=None):
-        if isinstance(steps, list):
-            for idx, step in enumerate(steps):
-                path = f"{base}/{idx}" if base else f"sequence/{idx}"
-                local_alias = step.get('alias') if isinstance(step, dict) else None
+    Also associates the alias with the item's path and main sub-blocks (if, then, else, repeat, choose, etc). Now, every level is mapped, even without an alias, using the inherited alias + relative path as the default value.
+    Returns a tuple (automation, mapping) so the parsed YAML can be reused by the caller."""
+    def map_steps(base, steps, mapping):
+        # Iterative traversal (explicit stack) to avoid one Python call per node and the recursion limit.
+        # Each entry is (path_segments, node, nearest_alias, nearest_alias_depth, is_list_item); paths are kept as
+        # tuples of segments and only joined when written to the mapping. List items are always mapped, dicts are
+        # mapped when they have a path. Children are pushed in reverse to keep the original mapping order.
+        _isinstance = isinstance
+        _dict = dict
+        _list = list
+        _containers = (dict, list)
+        _str = str
+        stack = [((_str(base),) if base else (), steps, None, 0, False)]
+        while stack:
+            path_segments, node, nearest_alias, nearest_alias_depth, is_list_item = stack.pop()
+            if not is_list_item and _isinstance(node, _list):
+                prefix = path_segments if path_segments else ('sequence',)
+                stack.extend(
+                    (prefix + (_str(idx),), node[idx], nearest_alias, nearest_alias_depth, True)
+                    for idx in range(len(node) - 1, -1, -1)
+                )
+                continue
+            is_dict = _isinstance(node, _dict)
+            if not is_dict and not is_list_item:
+                # If not dict or list, do nothing
+                continue
+            if path_segments:
+                path = '/'.join(path_segments)
+                local_alias = node.get('alias') if is_dict else None
                 if local_alias:
                     mapping[path] = local_alias
-                    inherited_alias = local_alias
-                    inherited_alias_path = path
+                    nearest_alias = local_alias
+                    nearest_alias_depth = len(path_segments)
+                elif nearest_alias:
+                    # path_sublevel = path without the prefix of the inherited alias path
+                    path_sublevel = '/'.join(path_segments[nearest_alias_depth:])
+                    mapping[path] = f"{nearest_alias}//{path_sublevel}"
                 else:
-                    if nearest_alias:
-                        # path_sublevel = path without the prefix of the inherited alias path
-                        path_sublevel = path[len(nearest_alias_path):].lstrip('/') if nearest_alias_path else path
-                        mapping[path] = f"{nearest_alias}//{path_sublevel}"
-                    else:
-                        mapping[path] = path
-                    inherited_alias = nearest_alias
-                    inherited_alias_path = nearest_alias_path
-                if isinstance(step, dict):
-                    for key, value in step.items():
-                        map_steps(f"{path}/{key}", value, mapping, inherited_alias, inherited_alias_path)
-        elif isinstance(steps, dict):
-            local_alias = steps.get('alias')
-            if local_alias and base:
-                mapping[base] = local_alias
-                inherited_alias = local_alias
-                inherited_alias_path = base
-            else:
-                if nearest_alias and base:
-                    path_sublevel = base[len(nearest_alias_path):].lstrip('/') if nearest_alias_path else base
-                    mapping[base] = f"{nearest_alias}//{path_sublevel}"
-                elif base:
-                    mapping[base] = base
-                inherited_alias = nearest_alias
-                inherited_alias_path = nearest_alias_path
-            for key, value in steps.items():
-                map_steps(f"{base}/{key}" if base else key, value, mapping, inherited_alias, inherited_alias_path)
-        # If not dict or list, do nothing
+                    mapping[path] = path
+            if is_dict:
+                # Scalar values (most of a step's keys) are never mapped, so they are not pushed at all
+                children = [
+                    (path_segments + (_str(key),), value, nearest_alias, nearest_alias_depth, False)
+                    for key, value in node.items()
+                    if _isinstance(value, _containers)
+                ]
+                children.reverse()
+                stack.extend(children)
 
     with open(yaml_file, encoding='utf-8') as f:
-        automation = yaml.safe_load(f)
+        automation = yaml.load(f, Loader=_YAML_LOADER)
 
     mapping = {}
     for key, value in automation.items():
         if key == 'sequence' or isinstance(value, (list, dict)):
             map_steps(key, value, mapping)
-    return mapping
+    # Intern the paths: trace lookups then hit the cached hash of the same string objects
+    mapping = {sys.intern(path): alias for path, alias in mapping.items()}
+    return automation, mapping
 
-def process_trace(trace_file, alias_mapping, output_file=None, timezone=None):
-    """Processes the trace file and structures the data. If output_file is provided, saves the result to the file."""
-    tz = pytz.timezone(timezone) if timezone else pytz.timezone('UTC')
-    event_list = []
-    current_iteration = 0
-
-    with open(trace_file) as f:
-        trace_data = json.load(f)
+def resolve_path_variation(path, alias_mapping):
+    """Resolves the alias of a trace path missing from the mapping, trying its plural/singular variations
+    for action(s), condition(s), trigger(s) one kind at a time, then with all of them swapped at once.
+    Returns the path itself when no variation is mapped."""
+    for old, new in _PATH_VARIATIONS:
+        variation = path.replace(old, new)
+        if variation in alias_mapping:
+            return alias_mapping[variation]
+    return alias_mapping.get(swap_plural_segments(path), path)
 
-    # Collect all events in a single list
+def iter_trace_events(trace_data):
+    """Yields every event of the trace (events without a path are skipped), in file order"""
     for event in trace_data['trace']['trace'].values():
         if isinstance(event, list):
             events = event
@@ -104,45 +227,55 @@ def process_trace(trace_file, alias_mapping, output_file=None, timezone=None):
         for ev in events:
             if not isinstance(ev, dict) or 'path' not in ev:
                 continue
-            event_list.append(ev)
+            yield ev
+
+def iter_trace(trace_data, alias_mapping, timezone=None, assume_sorted=False):
+    """Structures the already parsed trace, yielding one entry at a time (iteration markers as strings, events as dicts).
+    Events are sorted by timestamp unless assume_sorted is set, in which case they are streamed in file order."""
+    tz = _get_tz(timezone or 'UTC')
+    alias_lookup = dict(alias_mapping)  # also remembers how each unmapped trace path was resolved
+    repeat_flags = {}  # path -> whether it is inside a repeat block (paths repeat heavily across events)
+    current_iteration = 0
+
+    # Local bindings for the per-event loop (avoid repeated global/attribute lookups)
+    from_iso = datetime.fromisoformat
+    to_timezone = datetime.astimezone
+    to_string = datetime.strftime
+    timestamp_format = '%Y-%m-%d %H:%M:%S.%f %Z'
+    get_alias = alias_lookup.get
+    intern = sys.intern
 
-    # Sort all events by timestamp (considering milliseconds)
-    event_list.sort(key=lambda ev: datetime.fromisoformat(ev.get('timestamp')).timestamp() if 'timestamp' in ev else 0)
+    # Parse each timestamp only once; the (datetime, event) pairs only reference the trace events
+    event_list = ((from_iso(ev['timestamp']), ev) for ev in iter_trace_events(trace_data))
+    if not assume_sorted:
+        # Sort all events by timestamp (considering milliseconds); aware datetimes compare directly
+        event_list = sorted(event_list, key=itemgetter(0))
 
-    output = []
-    for ev in event_list:
-        timestamp = datetime.fromisoformat(ev['timestamp']).astimezone(tz)
-        path = ev['path']
-        result = ev.get('result', {})
+    for event_time, ev in event_list:
+        # Skip the conversion (and the new datetime) when the timestamp is already in the output timezone
+        timestamp = event_time if event_time.tzinfo is tz else to_timezone(event_time, tz)
+        # Paths repeat heavily across events: interning dedupes them and lets dict lookups reuse the cached hash
+        path = intern(ev['path'])
+        result = ev.get('result')
         error = ev.get('error')
 
         # Map correct alias (show friendly alias, not path)
-        alias = alias_mapping.get(path)
-        if not alias:
-            # Try plural/singular variations for action(s), condition(s), trigger(s)
-            variations = [
-                path.replace('action/', 'actions/'),
-                path.replace('actions/', 'action/'),
-                path.replace('condition/', 'conditions/'),
-                path.replace('conditions/', 'condition/'),
-                path.replace('trigger/', 'triggers/'),
-                path.replace('triggers/', 'trigger/'),
-            ]
-            for var in variations:
-                if var in alias_mapping:
-                    alias = alias_mapping[var]
-                    break
+        alias = get_alias(path)
         if not alias:
-            alias = path
+            # Try plural/singular variations once per distinct path and remember the result for the next events
+            alias = alias_lookup[path] = resolve_path_variation(path, alias_mapping)
 
         # Detect new loop iterations
-        if 'repeat' in path:
+        in_repeat = repeat_flags.get(path)
+        if in_repeat is None:
+            in_repeat = repeat_flags[path] = 'repeat' in path
+        if in_repeat:
             current_iteration += 1
-            output.append(f"\n[ITERATION {current_iteration}]")
+            yield f"\n[ITERATION {current_iteration}]"
 
         # Build log line
         line = {
-            'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S.%f %Z'),
+            'timestamp': to_string(timestamp, timestamp_format),
             'alias': alias,
             'path': path,
             'data': {}
@@ -160,21 +293,39 @@ def process_trace(trace_file, alias_mapping, output_file=None, timezone=None):
         if error:
             line['error'] = error
 
-        output.append(line)
-    # If output_file is provided, save the formatted output to the file (append mode to not overwrite)
-    if output_file:
-        formatted_output = format_output(output)
-        with open(output_file, 'a', encoding='utf-8') as f:
-            f.write("\n".join(formatted_output))
-        return output  # still returns for compatibility
-    return output
+        yield line
 
-def format_output(processed_data):
-    """Formats the output for friendly display"""
-    output = []
+def process_trace(trace_file, alias_mapping, output_file=None, timezone=None, trace_data=None, output_fp=None, assume_sorted=False):
+    """Processes the trace file and structures the data. If output_file is provided, saves the result to the file.
+    If output_fp is provided (an already opened text file), the result is written to it instead of reopening output_file.
+    If trace_data is provided (already parsed trace), the trace file is not read again.
+    Returns the full list of entries; use iter_trace to stream them instead."""
+    if trace_data is None:
+        with open(trace_file, 'rb') as f:
+            trace_data = load_json(f)
+
+    output = list(iter_trace(trace_data, alias_mapping, timezone, assume_sorted))
+    # If an output handle is provided, stream the formatted output to it
+    if output_fp is not None:
+        write_output(output_fp, output)
+    # If only output_file is provided, save the formatted output to the file (append mode to not overwrite)
+    elif output_file:
+        with open(output_file, 'a', encoding='utf-8', buffering=_OUTPUT_BUFFER_SIZE) as f:
+            write_output(f, output)
+    return output  # still returns for compatibility
+
+def write_output(f, processed_data):
+    """Writes the formatted output to an opened text file, one entry at a time"""
+    write = f.write
+    for formatted_line in iter_format_output(processed_data):
+        write(formatted_line)
+        write('\n')
+
+def iter_format_output(processed_data):
+    """Formats the output for friendly display, yielding one entry at a time"""
     for entry in processed_data:
         if isinstance(entry, str):
-            output.append(entry)
+            yield entry
             continue
         # Show timestamp, alias and path
         line = f"{entry['timestamp']} | {entry['alias']} | {entry['path']}"
@@ -182,15 +333,18 @@ def format_output(processed_data):
             details = []
             for key, value in entry['data'].items():
                 if isinstance(value, dict):
-                    details.append(f"{key}: {json.dumps(value, indent=2, ensure_ascii=False)}")
+                    details.append(f"{key}: {dump_json(value)}")
                 else:
                     details.append(f"{key}: {value}")
             if details:
                 line += "\n  " + "\n  ".join(details)
         if 'error' in entry:
             line += f"\n  [ERROR] {entry['error']}"
-        output.append(line)
-    return output
+        yield line
+
+def format_output(processed_data):
+    """Formats the output for friendly display"""
+    return list(iter_format_output(processed_data))
 
 def main():
     import argparse
@@ -200,6 +354,7 @@ def main():
     parser.add_argument('trace_log')
     parser.add_argument('-o', '--output', default=None, help='Output file (if omitted, print to screen)')
     parser.add_argument('-tz', '--timezone', default=None, help='Timezone to use for output (default: local timezone)')
+    parser.add_argument('--assume-sorted', action='store_true', help='Trace events are already in timestamp order: skip sorting and stream them')
     
     args = parser.parse_args()
 
@@ -209,17 +364,12 @@ def main():
     output_file = args.output
     timezone = get_timezone(args.timezone)
     
-    # Load and display mapping
-    mapping = load_automation(yaml_file)
-
-    # Display full loaded YAML structure
-    with open(yaml_file, encoding='utf-8') as f:
-        automation_yaml = yaml.safe_load(f)
+    # Load and display mapping (the full loaded YAML structure is reused for display)
+    automation_yaml, mapping = load_automation(yaml_file)
 
     # Validation: compare main alias from YAML with friendly_name from trace
-    import json
-    with open(trace_file, encoding='utf-8') as f:
-        trace_data = json.load(f)
+    with open(trace_file, 'rb') as f:
+        trace_data = load_json(f)
     # Try to find friendly_name in the first trigger/0 event
     friendly_name = None
     try:
@@ -232,8 +382,8 @@ def main():
     if not friendly_name or not main_alias or friendly_name != main_alias:
         alert_name = f"[ALERT] The main alias from YAML ('{main_alias}') is different from the friendly_name in the trace ('{friendly_name}'). Make sure the trace matches the provided YAML.\n"
 
-    yaml_structure = pprint.pformat(automation_yaml, sort_dicts=False, width=120)
-    mapping_structure = pprint.pformat(mapping, sort_dicts=False, width=120)
+    yaml_structure = dump_yaml(automation_yaml)
+    mapping_structure = dump_yaml(mapping)
 
     # Prepare execution parameters summary
     params_summary = (
@@ -247,15 +397,10 @@ def main():
         "\n\n[IDENTIFIED ALIAS MAPPING]\n" + mapping_structure
     )
 
+    output_fp = None
     if not output_file:
-        try:
-            from colorama import Fore, Style, init as colorama_init
-            from rich import print as rich_print
-            colorama_init()
-            use_rich = True
-        except ImportError:
-            use_rich = False
-        if use_rich:
+        Fore, Style, rich_print = _get_pretty()
+        if rich_print is not None:
             # Use rich for pretty printing the YAML and mapping
             rich_print(f"[bold cyan]{params_summary}[/bold cyan]")
             if alert_name:
@@ -267,33 +412,36 @@ def main():
         else:
             print(params_summary)
             if alert_name:
-                print(Fore.RED + alert_name + Style.RESET_ALL)
+                print(Fore.RED + alert_name + Style.RESET_ALL if Fore else alert_name)
             print("[LOADED YAML - FULL STRUCTURE]")
             print(yaml_structure)
             print("\n[IDENTIFIED ALIAS MAPPING]")
             print(mapping_structure)
     else:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(output_structure + "\n\n")
+        # Open the output file once; the header and all trace entries go through the same buffered handle
+        output_fp = open(output_file, 'w', encoding='utf-8', buffering=_OUTPUT_BUFFER_SIZE)
+        output_fp.write(output_structure + "\n\n")
         print("\n[YAML and mapping loaded. Output will be saved to file, not displayed on screen.]")
 
-    # Processing
-    data = process_trace(trace_file, mapping, output_file if output_file else None, timezone)
-    # If no output_file, print to screen (compatible mode)
-    if not output_file:
-        formatted_output = format_output(data)
-        try:
-            from colorama import Fore, Style, init as colorama_init
-            colorama_init()
-            for line in formatted_output:
+    # Processing (entries are streamed, never kept all in memory)
+    data = iter_trace(trace_data, mapping, timezone, assume_sorted=args.assume_sorted)
+    if output_fp is not None:
+        with output_fp:
+            write_output(output_fp, data)
+    else:
+        # If no output_file, print to screen (compatible mode)
+        Fore, Style, _ = _get_pretty()
+        if Fore:
+            for line in iter_format_output(data):
                 if '[ERROR]' in line:
                     print(Fore.RED + line + Style.RESET_ALL)
                 elif '[ITERATION' in line:
                     print(Fore.CYAN + line + Style.RESET_ALL)
                 else:
                     print(line)
-        except ImportError:
-            print("\n".join(formatted_output))
+        else:
+            for line in iter_format_output(data):
+                print(line)
 
 if __name__ == "__main__":
     main()